@@ -1,17 +1,46 @@
 import logging
 from flask import Flask, request, jsonify
+from flask.json.provider import DefaultJSONProvider
+import orjson
 from flask_cors import CORS
 from apscheduler.schedulers.background import BackgroundScheduler
 import class_checker
-import requests
+import httpx
 import time
+import threading
+import functools
+import heapq
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
 from collections import defaultdict
 import os # Import the os module
 
 # --- Setup Robust Logging ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# --- Fast JSON: every jsonify() response is serialized by orjson straight to bytes ---
+# orjson always emits compact output and has no equivalent for json.dumps/loads kwargs,
+# so those (and the provider's `compact` setting) are intentionally ignored; `sort_keys` is honored.
+class OrjsonProvider(DefaultJSONProvider):
+    def _dumps_bytes(self, obj):
+        option = orjson.OPT_SORT_KEYS if self.sort_keys else 0
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        return self._dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if args and kwargs: raise TypeError("app.json.response() takes either args or kwargs, not both")
+        if not args and not kwargs: obj = None
+        elif len(args) == 1: obj = args[0]
+        else: obj = args or kwargs
+        return self._app.response_class(self._dumps_bytes(obj), mimetype=self.mimetype)
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 # Use Flask's logger for consistency
 gunicorn_logger = logging.getLogger('gunicorn.error')
 app.logger.handlers = gunicorn_logger.handlers
@@ -19,15 +48,56 @@ app.logger.setLevel(gunicorn_logger.level)
 
 CORS(app)
 
+# Scheduler jobs log through a plain module logger so they never need an app context
+logger = logging.getLogger(__name__)
+logger.setLevel(gunicorn_logger.level)
+
 # --- In-memory Data Storage ---
+# Guards tracked_classes, notify_tracker and the indexes below: Flask workers and scheduler threads share them
+STATE_LOCK = threading.RLock()
 tracked_classes = {}
 app_settings = {'term': '2257', 'ntfyTopic': 'susumaanclassalerts'}
 notify_tracker = {}
+# Min-heap of (nextDueMs, classNumber) for reminders; stale entries are discarded when popped
+reminder_heap = []
+# Reverse indexes over tracked_classes, kept in sync on add/delete so ticks don't rebuild them
+class_number_to_name = {}
+name_to_numbers = defaultdict(set)
+# Encoded "Title/Instructor/Seats" footer per tracked class: built on first send, dropped only when those fields change
+notification_footers = {}
 
 MAX_NOTIFICATIONS = 10
 NOTIFICATION_INTERVAL_HOURS = 1
+NOTIFICATION_INTERVAL_MS = NOTIFICATION_INTERVAL_HOURS * 60 * 60 * 1000
+
+# Status check interval backs off while nothing changes, and snaps back on any change
+STATUS_CHECK_BASE_MINUTES = 8
+STATUS_CHECK_MAX_MINUTES = 64
+status_check_minutes = STATUS_CHECK_BASE_MINUTES
+# Whether each job is currently resumed; guarded by STATE_LOCK along with the state it depends on
+jobs_running = {'status_check_job': False, 'reminder_check_job': False}
+
+# --- Shared HTTP/2 client for ntfy.sh (one warm, multiplexed connection across ticks) ---
+NTFY_CLIENT = httpx.Client(
+    timeout=httpx.Timeout(5, connect=3),
+    transport=httpx.HTTPTransport(http2=True, retries=2, limits=httpx.Limits(max_connections=16, max_keepalive_connections=16))
+)
+# Notifications raised in the same tick are published concurrently over NTFY_CLIENT
+NOTIFY_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix='ntfy')
+
+# --- Notification Tracker ---
+@dataclass(slots=True)
+class Tracker:
+    count: int = 0
+    lastSent: int = 0
+    lastStatus: str = 'FULL'
 
 # --- Helper ---
+def now_ms():
+    # Monotonic milliseconds: cheap to read and safe for lastSent interval math
+    return time.monotonic_ns() // 1_000_000
+
+@functools.lru_cache(maxsize=32)
 def get_term_name(term_code):
     if not term_code or len(term_code) != 4: return 'Unknown Term'
     year = 2000 + int(term_code[1:3])
@@ -37,12 +107,53 @@ def get_term_name(term_code):
     if term_char == '7': return f"Fall {year}"
     return 'Unknown Term'
 
+def schedule_reminder(class_number, tracker):
+    # Caller holds STATE_LOCK and has just updated tracker.lastSent
+    if 0 < tracker.count < MAX_NOTIFICATIONS:
+        heapq.heappush(reminder_heap, (tracker.lastSent + NOTIFICATION_INTERVAL_MS, class_number))
+
+FOOTER_FIELDS = ('title', 'instructor', 'seats')
+
+def build_notification_footer(class_details):
+    title, instructor, seats = (class_details.get(field, '') for field in FOOTER_FIELDS)
+    return f"\nTitle: {title}\nInstructor: {instructor}\nSeats: {seats}".encode('utf-8')
+
+def get_notification_footer(class_details):
+    class_number = class_details['classNumber']
+    with STATE_LOCK:
+        footer = notification_footers.get(class_number)
+        if footer is None:
+            footer = build_notification_footer(class_details)
+            # Only cache a footer built from the details currently stored; an older send must not overwrite it
+            if tracked_classes.get(class_number) is class_details: notification_footers[class_number] = footer
+    return footer
+
+def store_tracked_class(class_number, class_details):
+    previous = tracked_classes.get(class_number)
+    tracked_classes[class_number] = class_details
+    if previous is None or any(previous.get(field) != class_details.get(field) for field in FOOTER_FIELDS):
+        notification_footers.pop(class_number, None)
+
+def index_tracked_class(class_number, class_name):
+    unindex_tracked_class(class_number)
+    class_number_to_name[class_number] = class_name
+    name_to_numbers[class_name].add(class_number)
+
+def unindex_tracked_class(class_number):
+    class_name = class_number_to_name.pop(class_number, None)
+    if class_name is None: return
+    numbers = name_to_numbers[class_name]
+    numbers.discard(class_number)
+    if not numbers: del name_to_numbers[class_name]
+
 # --- API Endpoints (No changes in this section) ---
 @app.route('/api/state', methods=['GET'])
 def get_full_state():
+    with STATE_LOCK:
+        classes = list(tracked_classes.values())
     return jsonify({
         "settings": { "term": app_settings["term"], "termName": get_term_name(app_settings["term"]), "ntfyTopic": app_settings["ntfyTopic"] },
-        "trackedClasses": list(tracked_classes.values())
+        "trackedClasses": classes
     })
 
 @app.route('/api/settings', methods=['POST'])
@@ -50,10 +161,17 @@ def update_settings():
     data = request.get_json()
     term_changed = False
     if 'term' in data and data['term'] != app_settings['term']:
-        app.logger.info(f"Term changed from {app_settings['term']} to {data['term']}")
-        app_settings['term'] = data['term']
-        tracked_classes.clear()
-        notify_tracker.clear()
+        app.logger.info("Term changed from %s to %s", app_settings['term'], data['term'])
+        with STATE_LOCK:
+            app_settings['term'] = data['term']
+            tracked_classes.clear()
+            notify_tracker.clear()
+            reminder_heap.clear()
+            notification_footers.clear()
+            class_number_to_name.clear()
+            name_to_numbers.clear()
+            sync_scheduler_jobs()
+        class_checker.clear_cache()
         term_changed = True
     if 'ntfyTopic' in data:
         app_settings['ntfyTopic'] = data['ntfyTopic']
@@ -62,7 +180,7 @@ def update_settings():
 @app.route('/api/search/<class_name>', methods=['GET'])
 def search_class(class_name):
     term = app_settings.get('term')
-    results = class_checker.fetch_class_details(class_name, term)
+    results = class_checker.fetch_or_join(class_name, term).result()
     return jsonify(results)
 
 @app.route('/api/tracked', methods=['POST'])
@@ -70,85 +188,170 @@ def add_tracked_class():
     class_details = request.get_json()
     class_number = class_details.get('classNumber')
     if not class_number: return jsonify({"error": "classNumber is required"}), 400
+    if not class_details.get('className'): return jsonify({"error": "className is required"}), 400
     
-    tracked_classes[class_number] = class_details
-    app.logger.info(f"Added {class_number} to tracking list. Performing immediate check.")
+    with STATE_LOCK:
+        store_tracked_class(class_number, class_details)
+        index_tracked_class(class_number, class_details['className'])
+        sync_scheduler_jobs()
+    app.logger.info("Added %s to tracking list. Performing immediate check.", class_number)
     perform_immediate_check(class_details)
-    return jsonify(list(tracked_classes.values())), 201
+    with STATE_LOCK:
+        sync_scheduler_jobs()
+        classes = list(tracked_classes.values())
+    reschedule_status_check(changed=True)
+    return jsonify(classes), 201
 
 @app.route('/api/tracked/<class_number>', methods=['DELETE'])
 def delete_tracked_class(class_number):
-    tracked_classes.pop(class_number, None)
-    notify_tracker.pop(class_number, None)
-    app.logger.info(f"Removed {class_number} from tracking list.")
-    return jsonify(list(tracked_classes.values()))
+    with STATE_LOCK:
+        tracked_classes.pop(class_number, None)
+        notify_tracker.pop(class_number, None)
+        notification_footers.pop(class_number, None)
+        unindex_tracked_class(class_number)
+        sync_scheduler_jobs()
+        classes = list(tracked_classes.values())
+    app.logger.info("Removed %s from tracking list.", class_number)
+    return jsonify(classes)
 
 # --- Notification Logic ---
 def perform_immediate_check(class_details):
     class_number = class_details['classNumber']
-    fresh_details_list = class_checker.fetch_class_details(class_details['className'], app_settings['term'])
-    for fresh_details in fresh_details_list:
-        if fresh_details['classNumber'] == class_number:
-            tracked_classes[class_number] = fresh_details
-            if fresh_details['status'] == 'OPEN':
-                app.logger.info(f"Newly added class {class_number} is already OPEN. Sending notification.")
-                tracker = {'count': 0, 'lastSent': 0, 'lastStatus': 'FULL'}
-                notify_tracker[class_number] = tracker
-                send_notification(fresh_details, 'OPEN')
-                tracker.update({'count': 1, 'lastSent': int(time.time() * 1000), 'lastStatus': 'OPEN'})
-            else:
-                notify_tracker[class_number] = {'count': 0, 'lastSent': 0, 'lastStatus': 'FULL'}
-            break
-
-def check_class_statuses():
-    with app.app_context():
-        app.logger.info("--- Running background status check ---")
-        if not tracked_classes: return
-
-        classes_to_fetch = defaultdict(list)
-        for details in tracked_classes.values(): classes_to_fetch[details['className']].append(details['classNumber'])
+    # Fast path: the payload came straight from a recent /api/search, so there is nothing to refetch
+    if class_checker.is_fresh(class_details):
+        fresh_details = class_details
+    else:
+        fresh_details_list = class_checker.fetch_or_join(class_details['className'], app_settings['term']).result()
+        fresh_details = next((d for d in fresh_details_list if d.get('classNumber') == class_number), None)
+        if fresh_details is None: return
 
+    with STATE_LOCK:
+        # Deleted (or the term changed) while the lookup was in flight
+        if class_number not in tracked_classes: return
+        store_tracked_class(class_number, fresh_details)
+        tracker = Tracker()
+        notify_tracker[class_number] = tracker
+    if fresh_details['status'] == 'OPEN':
+        logger.info("Newly added class %s is already OPEN. Sending notification.", class_number)
+        send_notification(fresh_details, 'OPEN')
+        with STATE_LOCK:
+            tracker.count, tracker.lastSent, tracker.lastStatus = 1, now_ms(), 'OPEN'
+            schedule_reminder(class_number, tracker)
+
+def check_class_statuses(changed_numbers=None):
+    """Returns True if any tracked class changed status during this check.
+    Changed class numbers are also appended to changed_numbers as they happen, so callers see them even if the tick fails."""
+    if changed_numbers is None: changed_numbers = []
+    logger.info("--- Running background status check ---")
+    with STATE_LOCK:
+        if not tracked_classes: return False
+        classes_to_fetch = {name: list(numbers) for name, numbers in name_to_numbers.items()}
+    pending_notifications = []
+
+    # Fetch every class in one batch; state updates below stay on this thread
+    fetched = class_checker.fetch_many(list(classes_to_fetch.keys()), app_settings['term'])
+
+    # Always publish what this tick already recorded, even if a later class blows up
+    try:
         for class_name, numbers in classes_to_fetch.items():
-            fresh_details_list = class_checker.fetch_class_details(class_name, app_settings['term'])
+            fresh_details_list = fetched[class_name]
+            if any('error' in d for d in fresh_details_list):
+                logger.warning("Skipping %s this tick: %s", class_name, fresh_details_list[0]['error'])
+                continue
             fresh_details_map = {d['classNumber']: d for d in fresh_details_list}
 
             for num in numbers:
                 if num not in fresh_details_map: continue
                 new_details = fresh_details_map[num]
-                tracked_classes[num] = new_details
+                with STATE_LOCK:
+                    # Skip classes removed while the fetch was in flight
+                    if num not in tracked_classes: continue
+                    store_tracked_class(num, new_details)
                 
-                tracker = notify_tracker.get(num, {'count': 0, 'lastSent': 0, 'lastStatus': 'FULL'})
-                old_status, new_status = tracker['lastStatus'], new_details['status']
+                    # Stored, so a class whose immediate check found nothing isn't re-reported as a change every tick
+                    tracker = notify_tracker.setdefault(num, Tracker())
+                    old_status, new_status = tracker.lastStatus, new_details['status']
 
-                if new_status == old_status: continue
-                app.logger.info(f"Status change for {num}: {old_status} -> {new_status}")
+                    if new_status == old_status: continue
+                    changed_numbers.append(num)
+                    logger.info("Status change for %s: %s -> %s", num, old_status, new_status)
                 
-                if new_status == 'OPEN':
-                    tracker.update({'count': 0, 'lastSent': 0})
-                    send_notification(new_details, 'OPEN')
-                    tracker.update({'count': 1, 'lastSent': int(time.time() * 1000)})
-                elif new_status == 'FULL' and old_status == 'OPEN':
-                    send_notification(new_details, 'FULL')
-                    tracker.update({'count': 0, 'lastSent': 0})
+                    if new_status == 'OPEN':
+                        pending_notifications.append((new_details, 'OPEN'))
+                        tracker.count, tracker.lastSent = 1, now_ms()
+                        schedule_reminder(num, tracker)
+                    elif new_status == 'FULL' and old_status == 'OPEN':
+                        pending_notifications.append((new_details, 'FULL'))
+                        tracker.count, tracker.lastSent = 0, 0
                 
-                tracker['lastStatus'] = new_status
+                    tracker.lastStatus = new_status
+    finally:
+        with STATE_LOCK:
+            sync_scheduler_jobs()
+        send_notifications(pending_notifications)
+    return bool(changed_numbers)
+
+def run_status_check():
+    changed_numbers = []
+    try:
+        check_class_statuses(changed_numbers)
+    finally:
+        # Changes recorded before a failure still count, so the interval doesn't back off
+        reschedule_status_check(bool(changed_numbers))
+
+def sync_scheduler_jobs():
+    # Caller holds STATE_LOCK. Each job only wakes while there is something for it to do
+    for job_id, needed in (('status_check_job', bool(tracked_classes)), ('reminder_check_job', bool(notify_tracker))):
+        if needed == jobs_running[job_id]: continue
+        if needed: scheduler.resume_job(job_id)
+        else: scheduler.pause_job(job_id)
+        jobs_running[job_id] = needed
+
+def reschedule_status_check(changed):
+    global status_check_minutes
+    with STATE_LOCK:
+        # Rescheduling would un-pause the job, so leave it alone while idle
+        if not jobs_running['status_check_job']: return
+        next_minutes = STATUS_CHECK_BASE_MINUTES if changed else min(STATUS_CHECK_MAX_MINUTES, status_check_minutes * 2)
+        if next_minutes == status_check_minutes: return
+        status_check_minutes = next_minutes
+        scheduler.reschedule_job('status_check_job', trigger='interval', minutes=next_minutes)
+    logger.info("Status check interval is now %s minutes.", next_minutes)
 
 def hourly_reminder_check():
-    with app.app_context():
-        now = int(time.time() * 1000)
-        for num, tracker in list(notify_tracker.items()):
-            details = tracked_classes.get(num)
+    now = now_ms()
+    due = []
+    with STATE_LOCK:
+        while reminder_heap and reminder_heap[0][0] <= now:
+            due_ms, num = heapq.heappop(reminder_heap)
+            tracker, details = notify_tracker.get(num), tracked_classes.get(num)
+            # Lazy deletion: skip entries superseded by a newer send, a removal or a FULL reset
+            if not tracker or tracker.lastSent + NOTIFICATION_INTERVAL_MS != due_ms: continue
             if not details or details['status'] != 'OPEN': continue
-            if 0 < tracker['count'] < MAX_NOTIFICATIONS and (now - tracker['lastSent']) >= (NOTIFICATION_INTERVAL_HOURS * 60 * 60 * 1000):
-                app.logger.info(f"Sending hourly reminder for {num}.")
-                send_notification(details, 'REMINDER')
-                tracker['count'] += 1
-                tracker['lastSent'] = now
+            if 0 < tracker.count < MAX_NOTIFICATIONS: due.append((num, tracker, details))
+
+    for num, tracker, details in due:
+        logger.info("Sending hourly reminder for %s.", num)
+        send_notification(details, 'REMINDER')
+        with STATE_LOCK:
+            # The class went FULL while this reminder was being sent
+            if tracker.count == 0: continue
+            tracker.count += 1
+            tracker.lastSent = now
+            if notify_tracker.get(num) is tracker: schedule_reminder(num, tracker)
+
+def send_notifications(pending):
+    """Publishes a batch of (class_details, reason) pairs concurrently and waits for all of them."""
+    if len(pending) == 1:
+        send_notification(*pending[0])
+        return
+    for future in [NOTIFY_EXECUTOR.submit(send_notification, details, reason) for details, reason in pending]:
+        future.result()
 
 def send_notification(class_details, reason):
     ntfy_topic = app_settings.get('ntfyTopic')
     if not ntfy_topic:
-        app.logger.warning("ntfy.sh topic is not set. Skipping notification.")
+        logger.warning("ntfy.sh topic is not set. Skipping notification.")
         return
 
     class_name = class_details['className']
@@ -161,29 +364,31 @@ def send_notification(class_details, reason):
         title = f"Class Full: {class_name}"
         message = f"❌ The open seat for {class_name} ({class_details['classNumber']}) is now full."
     elif reason == 'REMINDER':
-        count = notify_tracker.get(class_details['classNumber'], {}).get('count', 0)
+        tracker = notify_tracker.get(class_details['classNumber'])
+        count = tracker.count if tracker else 0
         title = f"Still Open: {class_name}"
         message = f"📢 Reminder ({count}/{MAX_NOTIFICATIONS}): A seat is still open for {class_name} ({class_details['classNumber']})."
     else: return
 
-    full_message = f"{message}\nTitle: {class_details['title']}\nInstructor: {class_details['instructor']}\nSeats: {class_details['seats']}"
+    footer = get_notification_footer(class_details)
     
     try:
         # The message body is already being correctly encoded to UTF-8
-        requests.post(
+        NTFY_CLIENT.post(
             f"https://ntfy.sh/{ntfy_topic}",
-            data=full_message.encode('utf-8'),
+            content=message.encode('utf-8') + footer,
             headers={"Title": title, "Priority": "high", "Tags": "tada"}
         )
-        app.logger.info(f"Sent notification for {class_details['classNumber']} ({reason}) to topic '{ntfy_topic}'")
+        logger.info("Sent notification for %s (%s) to topic '%s'", class_details['classNumber'], reason, ntfy_topic)
     except Exception as e:
-        app.logger.error(f"Error sending ntfy.sh notification: {e}")
+        logger.error("Error sending ntfy.sh notification: %s", e)
 
 
 # --- Scheduler Setup ---
 scheduler = BackgroundScheduler(daemon=True)
-scheduler.add_job(check_class_statuses, 'interval', minutes=8, id='status_check_job')
-scheduler.add_job(hourly_reminder_check, 'interval', minutes=5, id='reminder_check_job')
+# Both jobs start paused since nothing is tracked yet; they are resumed when the first class is added
+scheduler.add_job(run_status_check, 'interval', minutes=STATUS_CHECK_BASE_MINUTES, id='status_check_job', next_run_time=None)
+scheduler.add_job(hourly_reminder_check, 'interval', minutes=5, id='reminder_check_job', next_run_time=None)
 
 # --- FIX 2: Prevent scheduler from running twice in debug mode ---
 # The reloader runs the app in a subprocess. The main process which monitors for file changes
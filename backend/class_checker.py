@@ -1,8 +1,31 @@
-import requests
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+from cachetools import TTLCache
 
 BASE_API_URL = 'https://eadvs-cscc-catalog-api.apps.asu.edu/catalog-microservices/api/v1/search/classes'
 HEADERS = {'Authorization': 'Bearer null'}
 
+# Shared HTTP/2 client so concurrent lookups multiplex over one connection to the catalog API
+CLIENT = httpx.Client(
+    http2=True,
+    headers=HEADERS,
+    timeout=httpx.Timeout(10, connect=3),
+    limits=httpx.Limits(max_connections=16, max_keepalive_connections=16)
+)
+
+# Short-lived cache so back-to-back lookups of the same (class, term) skip the network
+CACHE_TTL_SECONDS = 30
+_details_cache = TTLCache(maxsize=256, ttl=CACHE_TTL_SECONDS)
+_cache_lock = threading.Lock()
+
+# In-flight lookups, so concurrent callers for the same (class, term) share one request
+FETCH_WORKERS = 8
+_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix='class-fetch')
+_inflight = {}
+_inflight_lock = threading.Lock()
+
 def get_full_schedule(class_info):
     """
     Parses all known locations for schedule data to create a detailed string
@@ -83,12 +106,15 @@ def fetch_class_details(class_name, term_number):
     url = f"{BASE_API_URL}?{'&'.join([f'{k}={v}' for k, v in params.items()])}"
     
     try:
-        res = requests.get(url, headers=HEADERS); res.raise_for_status(); data = res.json()
-    except requests.exceptions.RequestException as e:
+        res = CLIENT.get(url); res.raise_for_status(); data = res.json()
+    except (httpx.HTTPError, httpx.InvalidURL, ValueError) as e:
+        # ValueError covers a non-JSON body: httpx raises json.JSONDecodeError, not an HTTPError
         return [{"error": f"API Error for {class_name}: {e}"}]
 
     if not data.get('classes'): return []
 
+    # Wall-clock stamp: it round-trips through the frontend, so it must mean the same thing in every worker
+    fetched_at = int(time.time() * 1000)
     detailed_classes = []
     for item in data.get('classes', []):
         class_info = item.get('CLAS', {})
@@ -102,8 +128,66 @@ def fetch_class_details(class_name, term_number):
             "seats": f"{class_info.get('ENRLTOT', 0)} / {class_info.get('ENRLCAP', 0)}",
             "instructor": ', '.join(instructors) if instructors else 'Staff',
             "schedule": get_full_schedule(class_info),
-            "scheduleAbbreviation": get_schedule_abbreviation(class_info)
+            "scheduleAbbreviation": get_schedule_abbreviation(class_info),
+            "_fetchedAt": fetched_at
         }
         detailed_classes.append(detailed_class)
         
-    return detailed_classes
\ No newline at end of file
+    return detailed_classes
+
+def is_fresh(class_details, max_age_seconds=CACHE_TTL_SECONDS):
+    """
+    True if the details carry a status and were fetched within max_age_seconds.
+    """
+    fetched_at = class_details.get('_fetchedAt')
+    if not class_details.get('status') or not isinstance(fetched_at, (int, float)): return False
+    return 0 <= time.time() * 1000 - fetched_at <= max_age_seconds * 1000
+
+def fetch_class_details_cached(class_name, term_number):
+    """
+    Same as fetch_class_details, but serves repeat lookups within CACHE_TTL_SECONDS from memory.
+    Error results are never cached.
+    """
+    key = (class_name.strip().upper(), term_number)
+    with _cache_lock:
+        if key in _details_cache: return _details_cache[key]
+
+    results = fetch_class_details(class_name, term_number)
+    if not any('error' in r for r in results):
+        with _cache_lock:
+            _details_cache[key] = results
+    return results
+
+def fetch_or_join(class_name, term_number):
+    """
+    Returns a Future for the lookup. If the same (class, term) is already being fetched,
+    the caller joins that Future instead of issuing a second request.
+    """
+    key = (class_name.strip().upper(), term_number)
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is not None: return future
+        future = _executor.submit(fetch_class_details_cached, class_name, term_number)
+        _inflight[key] = future
+
+    def _forget(done):
+        with _inflight_lock:
+            if _inflight.get(key) is done: _inflight.pop(key)
+    future.add_done_callback(_forget)
+    return future
+
+def fetch_many(class_names, term_number):
+    """
+    Fetches several classes at once and returns {class_name: [details, ...]}.
+    The catalog API only accepts one subject/catalogNbr per query, so each name is
+    dispatched concurrently through fetch_or_join.
+    """
+    futures = {name: fetch_or_join(name, term_number) for name in class_names}
+    return {name: future.result() for name, future in futures.items()}
+
+def clear_cache():
+    """
+    Drops every cached lookup, e.g. after the term changes.
+    """
+    with _cache_lock:
+        _details_cache.clear()